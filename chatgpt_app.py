@@ -1,14 +1,20 @@
+import sys
+import hashlib
+import multiprocessing
 import streamlit as st
+import numpy as np
 import pandas as pd
-from statsmodels.tsa.seasonal import seasonal_decompose
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from sklearn.model_selection import train_test_split
 import plotly.graph_objects as go
 from helpers import (
     calculate_metrics,
     preprocess_file,
-    plot_decomposition,
+    plot_decomposition_figure,
     plot_autocorrelation_heatmaps,
+    plot_forecast_comparison,
+    pin_worker_to_cpus,
     time_model_execution,
 )
 from models import (
@@ -18,6 +24,21 @@ from models import (
     run_lstm_model,
 )
 
+@st.cache_resource
+def get_model_executor():
+    """Process pool shared across reruns, so workers keep their imported libraries (TensorFlow in particular) between runs.
+
+    Each worker is pinned to its own CPUs so the models' thread pools don't oversubscribe each other.
+    """
+    mp_context = multiprocessing.get_context("fork" if sys.platform.startswith("linux") else None)
+    worker_counter = mp_context.Value("i", 0)
+    return ProcessPoolExecutor(
+        max_workers=4,
+        mp_context=mp_context,
+        initializer=pin_worker_to_cpus,
+        initargs=(worker_counter, 4),
+    )
+
 # Streamlit App
 st.title("Univariate Time Series Forecasting App")
 st.write("""
@@ -69,11 +90,20 @@ with st.sidebar.expander("LSTM Parameters", expanded=False):
 
 # Upload and process data
 uploaded_file = st.file_uploader("Upload your time series CSV file", type="csv")
-time_series = preprocess_file(uploaded_file) if uploaded_file else None
+time_series = None
+if uploaded_file:
+    # Keep the parsed series in the session so widget reruns don't re-read the CSV
+    file_key = hashlib.md5(uploaded_file.getvalue()).hexdigest()
+    if st.session_state.get("ts_file") != file_key:
+        st.session_state["ts"] = preprocess_file(uploaded_file)
+        st.session_state["ts_file"] = file_key if st.session_state["ts"] is not None else None
+    time_series = st.session_state["ts"]
 
 if time_series is not None:
     # Train-test split
     train_data, test_data = train_test_split(time_series, train_size=train_size, shuffle=False)
+    train_index = np.arange(len(train_data))
+    test_index = np.arange(len(train_data), len(time_series))
 
     # Align data for lag-based models
     if len(test_data) < lags:
@@ -81,15 +111,15 @@ if time_series is not None:
     else:
         fig_original = go.Figure()
         fig_original.add_trace(go.Scatter(
-            x=train_data.index,
-            y=train_data.values,
+            x=train_index,
+            y=train_data,
             mode='lines',
             name='Train Data',
             line=dict(color='#39ff14')
         ))
         fig_original.add_trace(go.Scatter(
-            x=test_data.index,
-            y=test_data.values,
+            x=test_index,
+            y=test_data,
             mode='lines',
             name='Test Data',
             line=dict(color='#bababa')
@@ -109,8 +139,7 @@ if time_series is not None:
     seasonal_period = st.sidebar.number_input("Seasonal Period for Decomposition", min_value=1, max_value=365, value=12)
     with st.expander("Show Decomposition Plots"):
         try:
-            decomposition = seasonal_decompose(train_data, model="additive", period=seasonal_period)
-            st.pyplot(plot_decomposition(decomposition, train_data))
+            st.pyplot(plot_decomposition_figure(train_data, seasonal_period))
         except Exception as e:
             st.error(f"Decomposition failed: {e}")
 
@@ -125,112 +154,99 @@ if time_series is not None:
         progress_bar = st.progress(0)
         status_text = st.empty()
 
-        # Run models in parallel
+        # Run models in parallel, one process per model since the fits are CPU-bound and hold the GIL.
+        # Only a plain ndarray is shipped to the workers so the arguments pickle cheaply.
         results = {}
         losses = {}
-        with ThreadPoolExecutor() as executor:
-            futures = {
-                "ETS": executor.submit(time_model_execution, run_ets_model, train_data, trend, seasonal, damped_trend, seasonal_periods, len(test_data)),
-                "ARIMA": executor.submit(time_model_execution, run_arima_model, train_data, p, d, q, P, D, Q, m, use_seasonality, len(test_data)),
-                "XGBoost": executor.submit(time_model_execution, run_xgboost_model, train_data, lags, learning_rate, n_estimators, max_depth, len(test_data)),
-                "LSTM": executor.submit(time_model_execution, run_lstm_model, train_data, lags, lstm_units, lstm_layers, dropout, epochs, batch_size, len(test_data))
-            }
-
-            for i, (model, future) in enumerate(futures.items(), 1):
-                try:
-                    if model == "LSTM":
-                        result, train_loss, val_loss = future.result()
-                        results[model] = calculate_metrics(test_data, result)
-                        losses[model] = (train_loss, val_loss)
-                    else:
-                        results[model] = calculate_metrics(test_data, future.result())
-                except Exception as e:
-                    st.error(f"{model} failed: {e}")
-                progress_bar.progress(i / len(futures))
-
-            # Create a forecast comparison plot
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(
-                x=train_data.index,
-                y=train_data.values,
+        # Warm-start ARIMA from the params of the last fit with the same orders
+        arima_start_params = st.session_state.setdefault("arima_start_params", {})
+        arima_key = (p, d, q, P, D, Q, m, use_seasonality)
+        # Reuse the LSTM result when neither the training data nor its hyperparameters changed,
+        # since building and tracing the network costs more than training it for a few epochs
+        lstm_results = st.session_state.setdefault("lstm_results", {})
+        lstm_key = (hashlib.md5(train_data.tobytes()).hexdigest(), lags, lstm_units, lstm_layers, dropout, epochs, batch_size, len(test_data))
+        executor = get_model_executor()
+        futures = {
+            executor.submit(time_model_execution, run_ets_model, train_data, trend, seasonal, damped_trend, seasonal_periods, len(test_data)): "ETS",
+            executor.submit(time_model_execution, run_arima_model, train_data, p, d, q, P, D, Q, m, use_seasonality, len(test_data), arima_start_params.get(arima_key)): "ARIMA",
+            executor.submit(time_model_execution, run_xgboost_model, train_data, lags, learning_rate, n_estimators, max_depth, len(test_data)): "XGBoost"
+        }
+        if lstm_key in lstm_results:
+            lstm_future = Future()
+            lstm_future.set_result((lstm_results[lstm_key], None))
+        else:
+            lstm_future = executor.submit(time_model_execution, run_lstm_model, train_data, lags, lstm_units, lstm_layers, dropout, epochs, batch_size, len(test_data))
+        futures[lstm_future] = "LSTM"
+
+        # Each forecast is computed once and reused for both the metrics and the comparison plot.
+        # Results are collected as each model finishes so progress reflects actual completion.
+        forecasts = {}
+        for i, future in enumerate(as_completed(futures), 1):
+            model = futures[future]
+            try:
+                forecast, execution_time = future.result()
+                if execution_time is None:
+                    st.write(f"{model} reused from a previous run.")
+                else:
+                    st.write(f"{model} executed in {execution_time:.2f} seconds.")
+                if model == "LSTM":
+                    lstm_results[lstm_key] = forecast
+                    forecast, train_loss, val_loss = forecast
+                    losses[model] = (train_loss, val_loss)
+                elif model == "ARIMA":
+                    forecast, arima_start_params[arima_key] = forecast
+                results[model] = calculate_metrics(test_data, forecast)
+                forecasts[model] = forecast
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    # A worker died; start a fresh pool on the next run
+                    get_model_executor.clear()
+                st.error(f"{model} failed: {e}")
+            progress_bar.progress(i / len(futures))
+
+        # Keep the metrics table and plot in a fixed model order regardless of completion order
+        results = {model: results[model] for model in futures.values() if model in results}
+        forecasts = {f"{model} Forecast": forecasts[model] for model in futures.values() if model in forecasts}
+
+        # Create a forecast comparison plot
+        st.plotly_chart(plot_forecast_comparison(train_data, test_data, forecasts), use_container_width=True)
+
+        # Metrics Table and Loss Plot
+        col1, col2 = st.columns(2)
+        with col1:
+            st.write("Performance Metrics")
+            metrics_df = pd.DataFrame(results).T
+            st.dataframe(metrics_df)
+
+        if "LSTM" in losses:
+            train_loss, val_loss = losses["LSTM"]
+
+            # Plot training and validation loss
+            fig_loss = go.Figure()
+            fig_loss.add_trace(go.Scatter(
+                x=list(range(len(train_loss))),
+                y=train_loss,
                 mode='lines',
-                name='Actual',
-                line=dict(color='#39ff14')
+                name='Training Loss',
+                line=dict(color='#1f77b4')
             ))
-            fig.add_trace(go.Scatter(
-                x=test_data.index,
-                y=test_data.values,
+            fig_loss.add_trace(go.Scatter(
+                x=list(range(len(val_loss))),
+                y=val_loss,
                 mode='lines',
-                name='Test Data',
-                line=dict(color='#bababa')
+                name='Validation Loss',
+                line=dict(color='#ff7f0e')
             ))
-
-            forecasts = {
-                "ETS Forecast": run_ets_model(train_data, trend, seasonal, damped_trend, seasonal_periods, steps=len(test_data)),
-                "ARIMA Forecast": run_arima_model(train_data, p, d, q, P, D, Q, m, use_seasonality, steps=len(test_data)),
-                "XGBoost Forecast": run_xgboost_model(train_data, lags, learning_rate, n_estimators, max_depth, steps=len(test_data)),
-                "LSTM Forecast": run_lstm_model(train_data, lags, lstm_units, lstm_layers, dropout, epochs, batch_size, steps=len(test_data))
-            }
-
-            for label, forecast in forecasts.items():
-                future_index = list(range(len(train_data), len(train_data) + len(test_data)))
-                fig.add_trace(go.Scatter(
-                    x=future_index,
-                    y=forecast,
-                    mode='lines',
-                    name=label,
-                    line=dict(dash='dash')
-                ))
-
-            fig.update_layout(
-                title="Forecast Comparison",
-                xaxis_title="Time",
-                yaxis_title="Value",
+            fig_loss.update_layout(
+                title="LSTM Training and Validation Loss",
+                xaxis_title="Epochs",
+                yaxis_title="Loss",
                 template="plotly_dark",
-                legend=dict(title="Legend",
-                            x=0.01,
-                            y=0.99),
-                height=400
+                legend=dict(title="Legend"),
+                height=250
             )
+            with col2:
+                st.plotly_chart(fig_loss, use_container_width=True)
 
-            st.plotly_chart(fig, use_container_width=True)
-
-            # Metrics Table and Loss Plot
-            col1, col2 = st.columns(2)
-            with col1:
-                st.write("Performance Metrics")
-                metrics_df = pd.DataFrame(results).T
-                st.dataframe(metrics_df)
-
-            if "LSTM" in losses:
-                train_loss, val_loss = losses["LSTM"]
-
-                # Plot training and validation loss
-                fig_loss = go.Figure()
-                fig_loss.add_trace(go.Scatter(
-                    x=list(range(len(train_loss))),
-                    y=train_loss,
-                    mode='lines',
-                    name='Training Loss',
-                    line=dict(color='#1f77b4')
-                ))
-                fig_loss.add_trace(go.Scatter(
-                    x=list(range(len(val_loss))),
-                    y=val_loss,
-                    mode='lines',
-                    name='Validation Loss',
-                    line=dict(color='#ff7f0e')
-                ))
-                fig_loss.update_layout(
-                    title="LSTM Training and Validation Loss",
-                    xaxis_title="Epochs",
-                    yaxis_title="Loss",
-                    template="plotly_dark",
-                    legend=dict(title="Legend"),
-                    height=250
-                )
-                with col2:
-                    st.plotly_chart(fig_loss, use_container_width=True)
-
-            progress_bar.progress(100)
-            status_text.text("Forecasting Completed!")
\ No newline at end of file
+        progress_bar.progress(100)
+        status_text.text("Forecasting Completed!")
\ No newline at end of file
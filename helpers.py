@@ -1,27 +1,64 @@
+import os
 import pandas as pd
 import numpy as np
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
 import matplotlib.pyplot as plt
 import seaborn as sns
-from sklearn.metrics import mean_squared_error, mean_absolute_error
-from statsmodels.tsa.seasonal import seasonal_decompose
+import plotly.graph_objects as go
 from statsmodels.graphics.tsaplots import plot_acf, plot_pacf
 import time
+from collections import namedtuple
+from numba import njit
 import streamlit as st
 
-# Set theme for Matplotlib
+# Set theme for Matplotlib. Module code runs once per process, not on every Streamlit rerun,
+# so the dark styling lives here instead of being re-applied to each axis of each plot.
 plt.style.use('dark_background')
-sns.set_theme(style="darkgrid", rc={"axes.facecolor": "#1a1a1a", "grid.color": "#333333"})
+sns.set_theme(style="darkgrid", rc={
+    "axes.facecolor": "#1a1a1a",
+    "axes.titlecolor": "white",
+    "grid.color": "#333333",
+    "xtick.color": "white",
+    "ytick.color": "white",
+    "legend.facecolor": "#1a1a1a",
+    "legend.edgecolor": "#333333",
+    "legend.labelcolor": "white",
+})
 
 # Helper Functions
+@njit(cache=True, fastmath=True)
+def _metrics(y_true, y_pred):
+    """RMSE, MAE and SMAPE in a single pass."""
+    n = y_true.shape[0]
+    se = 0.0
+    ae = 0.0
+    sape = 0.0
+    for i in range(n):
+        # Difference and square in float64 so float32 inputs don't lose precision
+        t = np.float64(y_true[i])
+        p = np.float64(y_pred[i])
+        d = t - p
+        ad = abs(d)
+        se += d * d
+        ae += ad
+        sape += 2 * ad / (abs(t) + abs(p) + 1e-12)
+    return np.sqrt(se / n), ae / n, 100 * sape / n
+
 @st.cache_data
 def calculate_metrics(y_true, y_pred):
-    y_true = np.array(y_true)
-    y_pred = np.array(y_pred)
-    y_true = np.where(y_true == 0, 1e-6, y_true)
-    y_pred = np.where(y_pred == 0, 1e-6, y_pred)
-    rmse = np.sqrt(mean_squared_error(y_true, y_pred))
-    mae = mean_absolute_error(y_true, y_pred)
-    smape = 100 * np.mean(2 * np.abs(y_true - y_pred) / (np.abs(y_true) + np.abs(y_pred)))
+    # asarray avoids a copy for float32 inputs and gives the kernel a single dtype to compile for;
+    # the kernel itself computes in float64
+    y_true = np.asarray(y_true, dtype=np.float32)
+    y_pred = np.asarray(y_pred, dtype=np.float32)
+    # The kernel has no bounds checking and fastmath assumes finite values, so validate up front
+    if y_true.shape != y_pred.shape:
+        raise ValueError(f"Found input variables with inconsistent numbers of samples: {[len(y_true), len(y_pred)]}")
+    if y_true.size == 0:
+        raise ValueError("Cannot compute metrics on empty inputs.")
+    if not (np.isfinite(y_true).all() and np.isfinite(y_pred).all()):
+        raise ValueError("Input contains NaN or infinity.")
+    rmse, mae, smape = _metrics(y_true, y_pred)
     rmse = round(rmse)
     mae = round(mae)
     smape = f"{round(smape, 1)}%"
@@ -47,27 +84,73 @@ def try_multiple_formats(value):
 
 def preprocess_file(uploaded_file):
     try:
-        df = pd.read_csv(uploaded_file)
-        if len(df.columns) < 2:
+        table = pacsv.read_csv(uploaded_file)
+        if table.num_columns < 2:
             st.error("The uploaded file must have at least two columns.")
             return None
+        date_column = table.column_names[0]
+        value_column = table.column_names[-1]  # Assuming last column is the time series data
+        dates = table.column(date_column).to_pandas()
         try:
             # Attempt to parse dates using multiple formats
-            df[df.columns[0]] = df[df.columns[0]].apply(try_multiple_formats)
+            dates = dates.apply(try_multiple_formats)
 
             # Check for invalid rows (NaT values)
-            invalid_rows = df[df[df.columns[0]].isna()]
-            if not invalid_rows.empty:
+            if dates.isna().any():
                 st.warning("Some dates could not be parsed and were set to NaT.")
         except Exception as e:
             st.error(f"Error processing dates: {e}")
-        df = df.groupby(df.columns[0]).sum().reset_index()
-        time_series = df.iloc[:, -1]  # Assuming last column is the time series data
-        return time_series
+        # Sum duplicate dates over the sorted unique keys, dropping rows whose date could not be parsed
+        valid = dates.notna().to_numpy()
+        values = pc.fill_null(table.column(value_column), 0).to_numpy()[valid]
+        keys, inverse = np.unique(dates.to_numpy()[valid], return_inverse=True)
+        time_series = np.bincount(inverse, weights=values, minlength=len(keys))
+        # Downstream models and plots all work on a contiguous float32 array
+        return time_series.astype(np.float32)
     except Exception as e:
         st.error(f"Error reading the file: {e}")
         return None
 
+Decomposition = namedtuple("Decomposition", ["trend", "seasonal", "resid"])
+
+@njit(cache=True)
+def _additive_decompose(x, period):
+    n = x.shape[0]
+    half = period // 2
+    # Centered moving average from a running sum (2 x period MA for even periods)
+    csum = np.zeros(n + 1)
+    for t in range(n):
+        csum[t + 1] = csum[t] + x[t]
+    trend = np.full(n, np.nan)
+    for t in range(half, n - half):
+        window = csum[t + half + 1] - csum[t - half]
+        if period % 2 == 0:
+            window -= 0.5 * (x[t - half] + x[t + half])
+        trend[t] = window / period
+    # Seasonal component is the mean detrended value of each phase, centered to sum to zero
+    phase_sum = np.zeros(period)
+    phase_count = np.zeros(period)
+    for t in range(half, n - half):
+        phase_sum[t % period] += x[t] - trend[t]
+        phase_count[t % period] += 1
+    phase_mean = phase_sum / phase_count
+    phase_mean -= phase_mean.mean()
+    seasonal = np.empty(n)
+    for t in range(n):
+        seasonal[t] = phase_mean[t % period]
+    resid = x - trend - seasonal
+    return trend, seasonal, resid
+
+@st.cache_data
+def decompose(time_series, period):
+    """Additive moving-average decomposition, equivalent to statsmodels' seasonal_decompose."""
+    x = np.asarray(time_series, dtype=np.float64)
+    if np.isnan(x).any():
+        raise ValueError("This function does not handle missing values")
+    if x.shape[0] < 2 * period:
+        raise ValueError(f"x must have 2 complete cycles requires {2 * period} observations. x only has {x.shape[0]} observation(s)")
+    return Decomposition(*_additive_decompose(x, period))
+
 def plot_decomposition(decomposition, time_series):
     """Plots the decomposition components."""
     fig, ax = plt.subplots(4, 1, figsize=(10, 8), sharex=True)
@@ -77,16 +160,20 @@ def plot_decomposition(decomposition, time_series):
 
     for i, (comp, color) in enumerate(zip(components, colors)):
         ax[i].plot(data[i], label=comp, color=color)
-        ax[i].set_title(comp, fontsize=12, color="white")
-        legend = ax[i].legend(loc="upper left", fontsize=10, facecolor="#1a1a1a", edgecolor="#333333")
-        plt.setp(legend.get_texts(), color="white")
-        ax[i].set_facecolor("#1a1a1a")
-        ax[i].tick_params(axis="x", colors="white")
-        ax[i].tick_params(axis="y", colors="white")
+        ax[i].set_title(comp, fontsize=12)
+        ax[i].legend(loc="upper left", fontsize=10)
 
     plt.tight_layout()
     return fig
 
+@st.cache_data(max_entries=16)
+def plot_decomposition_figure(time_series, period):
+    """Decomposes the series and plots it. The Figure is cached so reruns with the same data and period reuse it."""
+    fig = plot_decomposition(decompose(time_series, period), time_series)
+    # The cache keeps its own pickled copy, so pyplot doesn't need to hold on to the figure
+    plt.close(fig)
+    return fig
+
 @st.cache_data
 def plot_autocorrelation_heatmaps(time_series, seasonal_period):
     """Plots autocorrelation and partial autocorrelation heatmaps with dynamic lags."""
@@ -95,20 +182,66 @@ def plot_autocorrelation_heatmaps(time_series, seasonal_period):
     fig, axes = plt.subplots(1, 2, figsize=(14, 5))
     plot_acf(time_series, ax=axes[0], lags=lags, color="#00ccff")
     plot_pacf(time_series, ax=axes[1], lags=lags, color="#ff5050")
-    axes[0].set_title(f"Autocorrelation (ACF) - {lags} Lags", color="white")
-    axes[1].set_title(f"Partial Autocorrelation (PACF) - {lags} Lags", color="white")
-    for ax in axes:
-        ax.set_facecolor("#1a1a1a")
-        ax.tick_params(axis="x", colors="white")
-        ax.tick_params(axis="y", colors="white")
-        ax.title.set_color("white")
+    axes[0].set_title(f"Autocorrelation (ACF) - {lags} Lags")
+    axes[1].set_title(f"Partial Autocorrelation (PACF) - {lags} Lags")
     plt.tight_layout()
     return fig
 
+def plot_forecast_comparison(train_data, test_data, forecasts):
+    """Plots the train and test data against each model's forecast over the test period."""
+    train_index = np.arange(len(train_data))
+    test_index = np.arange(len(train_data), len(train_data) + len(test_data))
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=train_index,
+        y=train_data,
+        mode='lines',
+        name='Actual',
+        line=dict(color='#39ff14')
+    ))
+    fig.add_trace(go.Scatter(
+        x=test_index,
+        y=test_data,
+        mode='lines',
+        name='Test Data',
+        line=dict(color='#bababa')
+    ))
+
+    for label, forecast in forecasts.items():
+        fig.add_trace(go.Scatter(
+            x=test_index,
+            y=forecast,
+            mode='lines',
+            name=label,
+            line=dict(dash='dash')
+        ))
+
+    fig.update_layout(
+        title="Forecast Comparison",
+        xaxis_title="Time",
+        yaxis_title="Value",
+        template="plotly_dark",
+        legend=dict(title="Legend",
+                    x=0.01,
+                    y=0.99),
+        height=400
+    )
+    return fig
+
 def time_model_execution(model_function, *args, **kwargs):
-    """Times the execution of a model."""
+    """Times the execution of a model. Returns the result and the execution time in seconds."""
     start_time = time.time()
     result = model_function(*args, **kwargs)
     execution_time = time.time() - start_time
-    st.write(f"{model_function.__name__} executed in {execution_time:.2f} seconds.")
-    return result
\ No newline at end of file
+    return result, execution_time
+
+def pin_worker_to_cpus(worker_counter, num_workers):
+    """Process pool initializer that pins each worker to its own disjoint slice of the available CPUs."""
+    if not hasattr(os, "sched_setaffinity"):
+        return
+    with worker_counter.get_lock():
+        worker_id = worker_counter.value
+        worker_counter.value += 1
+    cpus = np.array_split(sorted(os.sched_getaffinity(0)), num_workers)[worker_id % num_workers]
+    if len(cpus):
+        os.sched_setaffinity(0, cpus.tolist())
@@ -1,14 +1,69 @@
+import os
+import shutil
+from functools import lru_cache
 import numpy as np
+from numba import njit
 from statsmodels.tsa.holtwinters import ExponentialSmoothing
 from statsmodels.tsa.arima.model import ARIMA
 import xgboost as xgb
 from sklearn.metrics import mean_squared_error, mean_absolute_error
-from keras.models import Sequential
-from keras.layers import LSTM, Dense, Dropout
+
+# TensorFlow logging, oneDNN and threading settings; must be set before TensorFlow is first imported
+os.environ["TF_CPP_MIN_LOG_LEVEL"] = "3"
+os.environ["TF_ENABLE_ONEDNN_OPTS"] = "1"
+os.environ["TF_NUM_INTEROP_THREADS"] = "1"
+os.environ["TF_NUM_INTRAOP_THREADS"] = str(max(1, (os.cpu_count() or 2) // 2))
 
 # Model Functions
 # Define ETS model
+@njit(cache=True)
+def _ses_fit(x, alpha):
+    """One-step SSE of simple exponential smoothing at the best initial level, and the final level.
+
+    Each one-step forecast is a_t + b_t * l0 with b_t = (1 - alpha)^t, so the SSE is quadratic
+    in the initial level l0 and its minimizer has a closed form.
+    """
+    a = 0.0
+    b = 1.0
+    srr = 0.0
+    sbr = 0.0
+    sbb = 0.0
+    for t in range(x.shape[0]):
+        r = x[t] - a
+        srr += r * r
+        sbr += b * r
+        sbb += b * b
+        a += alpha * r
+        b *= 1.0 - alpha
+    l0 = sbr / sbb
+    return srr - sbr * l0, a + b * l0
+
+@njit(cache=True)
+def _ses_forecast(x, steps):
+    """Simple exponential smoothing, with alpha picked by golden-section search on the one-step SSE."""
+    inv_phi = (np.sqrt(5.0) - 1.0) / 2.0
+    lo, hi = 0.0, 1.0
+    a = hi - inv_phi * (hi - lo)
+    b = lo + inv_phi * (hi - lo)
+    fa = _ses_fit(x, a)[0]
+    fb = _ses_fit(x, b)[0]
+    for _ in range(50):
+        if fa < fb:
+            hi, b, fb = b, a, fa
+            a = hi - inv_phi * (hi - lo)
+            fa = _ses_fit(x, a)[0]
+        else:
+            lo, a, fa = a, b, fb
+            b = lo + inv_phi * (hi - lo)
+            fb = _ses_fit(x, b)[0]
+    level = _ses_fit(x, (lo + hi) / 2.0)[1]
+    return np.full(steps, level)
+
 def run_ets_model(time_series, trend, seasonal, damped_trend, seasonal_periods, steps=12):
+    if trend == "none" and seasonal == "none":
+        # Without trend or seasonality ETS is simple exponential smoothing, which the
+        # closed-form recursion fits far faster than statsmodels' bounded optimizer
+        return _ses_forecast(np.asarray(time_series, dtype=np.float64), steps)
     ets_model = ExponentialSmoothing(
         time_series,
         trend=trend if trend != "none" else None,
@@ -19,45 +74,114 @@ def run_ets_model(time_series, trend, seasonal, damped_trend, seasonal_periods,
     return ets_model.forecast(steps=steps)
 
 # Define ARIMA/SARIMA model
-def run_arima_model(time_series, p, d, q, P, D, Q, m, use_seasonality, steps=12):
+def _undifference(history, forecast, d, D, m):
+    """Integrates forecasts of the (1 - L)^d (1 - L^m)^D differenced series back onto the scale of history."""
+    poly = np.array([1.0])
+    seasonal_diff = np.zeros(m + 1)
+    seasonal_diff[[0, m]] = [1.0, -1.0]
+    for _ in range(d):
+        poly = np.convolve(poly, [1.0, -1.0])
+    for _ in range(D):
+        poly = np.convolve(poly, seasonal_diff)
+    order = len(poly) - 1
+    if order == 0:
+        return np.asarray(forecast)
+    values = np.concatenate([np.asarray(history[-order:], dtype=np.float64), np.empty(len(forecast))])
+    for h, w in enumerate(forecast):
+        values[order + h] = w - poly[1:] @ values[h:order + h][::-1]
+    return values[order:]
+
+def run_arima_model(time_series, p, d, q, P, D, Q, m, use_seasonality, steps=12, start_params=None):
+    """Fits ARIMA/SARIMA and returns the forecast with the fitted params.
+
+    The params can be passed back as start_params on the next run with the same orders
+    so the optimizer starts from the previous optimum instead of from scratch.
+    """
     if use_seasonality:
         from statsmodels.tsa.statespace.sarimax import SARIMAX
+        # Differencing up front shrinks the state vector the Kalman filter carries, and the
+        # forecast needs no parameter covariance, so the Hessian is skipped with cov_type="none"
         model = SARIMAX(
             time_series,
             order=(p, d, q),
             seasonal_order=(P, D, Q, m),
-        ).fit(disp=False)
-    else:
-        model = ARIMA(time_series, order=(p, d, q)).fit()
-    return model.forecast(steps=steps)
+            concentrate_scale=True,
+            enforce_stationarity=False,
+            simple_differencing=True,
+            hamilton_representation=True,
+        ).fit(disp=False, method="lbfgs", maxiter=50, start_params=start_params, low_memory=True, cov_type="none")
+        # With simple differencing the forecast is of the differenced series
+        return _undifference(time_series, model.forecast(steps=steps), d, D, m), model.params
+    model = ARIMA(time_series, order=(p, d, q), concentrate_scale=True).fit(
+        start_params=start_params,
+        method_kwargs={"maxiter": 50},
+        low_memory=True,
+    )
+    return model.forecast(steps=steps), model.params
 
 # Define XGBoost model
+def build_lag_matrix(time_series, lags):
+    """Builds the float32 lag feature matrix (most recent lag first) and target from a sliding window view."""
+    arr = np.asarray(time_series, dtype=np.float32)
+    windows = np.lib.stride_tricks.sliding_window_view(arr, lags + 1)
+    X = windows[:, -2::-1].copy()
+    y = windows[:, -1]
+    return X, y
+
+@lru_cache(maxsize=None)
+def _cuda_available():
+    """Whether xgboost was built with CUDA support and an NVIDIA GPU is visible."""
+    return bool(xgb.build_info().get("USE_CUDA")) and shutil.which("nvidia-smi") is not None
+
 def run_xgboost_model(time_series, lags, learning_rate, n_estimators, max_depth, steps=12):
-    X = np.array([time_series.shift(i) for i in range(1, lags + 1)]).T[lags:]
-    y = time_series[lags:]
-    model = xgb.XGBRegressor(
-        learning_rate=learning_rate,
-        n_estimators=n_estimators,
-        max_depth=max_depth,
-    )
-    model.fit(X[:-steps], y[:-steps])
-    return model.predict(X[-steps:])
+    X, y = build_lag_matrix(time_series, lags)
+    params = {
+        "objective": "reg:squarederror",
+        "learning_rate": learning_rate,
+        "max_depth": max_depth,
+        "tree_method": "hist",
+        "device": "cuda" if _cuda_available() else "cpu",
+    }
+    # Train on the float32 features directly through a DMatrix, skipping the sklearn wrapper's re-copy
+    model = xgb.train(params, xgb.DMatrix(X[:-steps], label=y[:-steps]), num_boost_round=n_estimators)
+    return model.inplace_predict(X[-steps:])
+
+def _physical_cores():
+    """Approximates the physical cores this process may run on as half of its logical CPUs."""
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)) // 2)
+    return max(1, (os.cpu_count() or 2) // 2)
+
+@lru_cache(maxsize=None)
+def _import_tensorflow():
+    """Imports TensorFlow once per process, sizes its thread pools and enables XLA compilation of the training step."""
+    import tensorflow as tf
+    tf.get_logger().setLevel("ERROR")
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+    tf.config.threading.set_intra_op_parallelism_threads(_physical_cores())
+    tf.config.optimizer.set_jit(True)
+    return tf
 
 def run_lstm_model(time_series, lags, lstm_units, lstm_layers, dropout, epochs, batch_size, steps=12):
+    # Keras is imported here so that only the process fitting the LSTM initializes TensorFlow
+    _import_tensorflow()
+    from keras.models import Sequential
+    from keras.layers import LSTM, Dense, Dropout
+
     # Prepare the data
-    X = np.array([time_series.shift(i) for i in range(1, lags + 1)]).T[lags:]
-    y = time_series[lags:]
+    X, y = build_lag_matrix(time_series, lags)
     X = X.reshape((X.shape[0], X.shape[1], 1))
     # Split data into train and validation
     X_train, X_val = X[:-steps], X[-steps:]
     y_train, y_val = y[:-steps], y[-steps:]
-    # Define the model
+    # Define the model. The LSTM layers keep the default tanh/sigmoid activations so Keras
+    # can dispatch the fused cuDNN/oneDNN kernel instead of the generic RNN loop.
     model = Sequential()
     for _ in range(lstm_layers - 1):
-        model.add(LSTM(lstm_units, activation="relu", return_sequences=True))
-    model.add(LSTM(lstm_units, activation="relu"))
-    model.add(Dense(1))
+        model.add(LSTM(lstm_units, return_sequences=True, dtype="float32"))
+    model.add(LSTM(lstm_units, dtype="float32"))
     model.add(Dropout(dropout))
+    model.add(Dense(1))
     model.compile(optimizer="adam", loss="mse")
     # Train the model with validation data
     history = model.fit(
@@ -67,7 +191,7 @@ def run_lstm_model(time_series, lags, lstm_units, lstm_layers, dropout, epochs,
         batch_size=batch_size,
         verbose=0
     )
-    # Forecast
-    predictions = model.predict(X_val).flatten()
+    # Forecast by calling the model directly, which skips predict()'s tf.data pipeline for a single small batch
+    predictions = np.asarray(model(X_val, training=False)).ravel()
     # Return predictions and loss history
     return predictions, history.history['loss'], history.history['val_loss']